@@ -0,0 +1,62 @@
+"""Benchmark alpha flattening for JPEG/BMP output.
+
+Compares the old flattening (Image.new + split() + paste) against flatten_alpha()
+for opaque and semi-transparent RGBA images. Allocations are counted with Pillow's
+own allocator statistics, since image buffers live outside the Python heap.
+
+Run from the repository root:
+    python benchmarks/bench_flatten_alpha.py
+"""
+import sys
+import time
+from pathlib import Path
+
+from PIL import Image
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from main import flatten_alpha
+
+BG_RGB = (255, 255, 255)
+SIZE = (2000, 1500)
+ROUNDS = 20
+
+def legacy_flatten(img, bg_rgb):
+    """Alpha flattening as convert_images did it before flatten_alpha()"""
+    if img.mode == 'P' and 'transparency' in img.info:
+        img = img.convert('RGBA')
+    if img.mode in ('RGBA', 'LA'):
+        background = Image.new('RGB', img.size, bg_rgb)
+        background.paste(img, mask=img.split()[-1])
+        img = background
+    return img
+
+def make_images():
+    """Return test images: fully opaque RGBA and RGBA with a gradient alpha"""
+    noise = Image.effect_noise(SIZE, 64).convert('L')
+    rgb = [noise, noise.transpose(Image.Transpose.FLIP_LEFT_RIGHT), noise.transpose(Image.Transpose.FLIP_TOP_BOTTOM)]
+    opaque = Image.merge('RGBA', rgb + [Image.new('L', SIZE, 255)])
+    gradient = Image.linear_gradient('L').resize(SIZE)
+    transparent = Image.merge('RGBA', rgb + [gradient])
+    return {'opaque RGBA': opaque, 'semi-transparent RGBA': transparent}
+
+def measure(func, img):
+    """Return (seconds per call, image buffers allocated per call)"""
+    func(img, BG_RGB)  # warm up
+    Image.core.reset_stats()
+    start = time.perf_counter()
+    for _ in range(ROUNDS):
+        func(img, BG_RGB)
+    elapsed = (time.perf_counter() - start) / ROUNDS
+    allocations = Image.core.get_stats()['new_count'] / ROUNDS
+    return elapsed, allocations
+
+def main():
+    print(f"{SIZE[0]}x{SIZE[1]} images, {ROUNDS} rounds each")
+    print(f"{'case':<24}{'method':<16}{'ms/image':>10}{'allocs/image':>14}")
+    for name, img in make_images().items():
+        for label, func in (('legacy', legacy_flatten), ('flatten_alpha', flatten_alpha)):
+            elapsed, allocations = measure(func, img)
+            print(f"{name:<24}{label:<16}{elapsed * 1000:>10.1f}{allocations:>14.1f}")
+
+if __name__ == "__main__":
+    main()
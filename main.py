@@ -1,12 +1,24 @@
 import sys
 import os
+import io
+import csv
+import hashlib
+import threading
+import time
+import tarfile
+import zipfile
+import multiprocessing
+from collections import deque, OrderedDict
+from multiprocessing.connection import wait as wait_connections
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from functools import lru_cache
 from pathlib import Path
 from datetime import datetime
 from PySide6.QtWidgets import *
 from PySide6.QtCore import *
 from PySide6.QtGui import *
 import qtawesome as qta
-from PIL import Image
+from PIL import Image, ImageChops, ImageSequence
 
 # Import AVIF support
 try:
@@ -21,6 +33,867 @@ try:
 except ImportError:
     pass
 
+# Import ICC colour management support (LittleCMS)
+try:
+    from PIL import ImageCms
+except ImportError:
+    ImageCms = None
+
+# zlib strategies tried by the PNG optimizer (Z_DEFAULT_STRATEGY, Z_FILTERED, Z_HUFFMAN_ONLY, Z_RLE)
+PNG_ZLIB_STRATEGIES = [0, 1, 2, 3]
+
+# ICC profile colour space that describes the pixels of each image mode
+ICC_MODE_COLOR_SPACES = {'L': 'GRAY', 'LA': 'GRAY', 'I': 'GRAY', 'I;16': 'GRAY', 'P': 'RGB', 'RGB': 'RGB', 'RGBA': 'RGB', 'CMYK': 'CMYK'}
+
+def icc_color_space(icc_profile):
+    """Return the colour space an ICC profile describes ('RGB', 'GRAY', 'CMYK', ...) from its header"""
+    return icc_profile[16:20].decode('latin-1').strip()
+
+def spread_values(band, values):
+    """Split the values of an L or P band into pieces below 32 for number_colors.
+
+    Returns (band, values) pairs where each band holds piece * 8 + 4 and values lists the
+    pieces of the given values. Values are ranked first, so a band that uses 32 values or
+    fewer stays in one piece.
+    """
+    rank_of = {value: rank for rank, value in enumerate(sorted(set(values)))}
+    pieces = [lambda rank: rank] if len(rank_of) <= 32 else [lambda rank: rank >> 5, lambda rank: rank & 31]
+    parts = []
+    for piece in pieces:
+        lut = [0] * 256
+        for value, rank in rank_of.items():
+            lut[value] = piece(rank) * 8 + 4
+        parts.append((band.point(lut, 'L'), [piece(rank_of[value]) for value in values]))
+    return parts
+
+def number_colors(img, colors, deadline=None):
+    """Return a P image holding the position in colors of every pixel's colour, which must be listed.
+
+    The bands are cut into pieces below 32 and numbered three pieces at a time by a palette
+    lookup. Pillow's palette lookup is only approximate within blocks of 8 levels, so each
+    piece is spread to the middle of its own block and the nearest palette colour is then
+    the exact one. The whole mapping runs in C; None is returned if deadline passes first.
+    """
+    parts = []
+    for band_index, band in enumerate(img.split()):
+        parts += spread_values(band, [color[band_index] for color in colors])
+
+    while True:
+        if deadline is not None and time.monotonic() >= deadline:
+            return None
+        # Combine the pieces with the fewest distinct values first
+        parts.sort(key=lambda part: len(set(part[1])))
+        group, parts = parts[:3], parts[3:]
+        group += group[:1] * (3 - len(group))
+        triples = list(zip(*(values for _, values in group)))
+        number_of = {triple: number for number, triple in enumerate(dict.fromkeys(triples))}
+
+        palette_img = Image.new('P', (1, 1))
+        palette_img.putpalette([value * 8 + 4 for triple in number_of for value in triple])
+        numbered = Image.merge('RGB', [band for band, _ in group]).quantize(palette=palette_img, dither=Image.Dither.NONE)
+        numbers = [number_of[triple] for triple in triples]
+
+        if not parts:
+            # Every band is in this last group, so each number stands for exactly one colour
+            lut = [0] * 256
+            for position, number in enumerate(numbers):
+                lut[number] = position
+            return numbered.point(lut)
+        parts += spread_values(numbered, numbers)
+
+def to_exact_palette(img, deadline=None):
+    """Map an RGB/RGBA image with 256 colours or fewer onto a palette exactly, or return None"""
+    colors = img.getcolors(256)
+    if colors is None:
+        return None
+
+    # Translucent colours go first so the tRNS chunk only has to cover them;
+    # a tRNS colour key becomes a fully transparent palette entry
+    key = img.info.get('transparency')
+    alpha_of = lambda color: color[3] if img.mode == 'RGBA' else 0 if color == key else 255
+    colors = sorted((color for _, color in colors), key=lambda color: alpha_of(color) == 255)
+    paletted = number_colors(img, colors, deadline)
+    if paletted is None:
+        return None
+    paletted.putpalette([channel for color in colors for channel in color[:3]])
+
+    paletted.info = {name: value for name, value in img.info.items() if name != 'transparency'}
+    alphas = [alpha_of(color) for color in colors if alpha_of(color) != 255]
+    if alphas:
+        paletted.info['transparency'] = bytes(alphas)
+
+    # Only keep the palette version when it holds exactly the same pixels
+    if ImageChops.difference(paletted.convert(img.mode), img).getbbox(alpha_only=False) is not None:
+        return None
+    return paletted
+
+def reduce_png_mode(img):
+    """Losslessly drop unused alpha and chroma so the image is stored in the smallest truecolour/greyscale type"""
+    # Drop the alpha channel when every pixel is fully opaque
+    if img.mode in ('RGBA', 'LA') and img.getchannel('A').getextrema() == (255, 255):
+        img = img.convert('RGB' if img.mode == 'RGBA' else 'L')
+
+    # Collapse to greyscale when the image has no chroma (R == G == B everywhere);
+    # an embedded RGB profile can't describe grey pixels, so those images stay RGB
+    icc_profile = img.info.get('icc_profile')
+    if img.mode in ('RGB', 'RGBA') and (not icc_profile or icc_color_space(icc_profile) == 'GRAY'):
+        r, g, b = img.getchannel('R'), img.getchannel('G'), img.getchannel('B')
+        if ImageChops.difference(r, g).getbbox() is None and ImageChops.difference(g, b).getbbox() is None:
+            key = img.info.get('transparency')
+            img = img.convert('L' if img.mode == 'RGB' else 'LA')
+            # A coloured tRNS key matches none of the grey pixels, and converting it would hide a real grey
+            if isinstance(key, tuple) and len(set(key)) > 1:
+                del img.info['transparency']
+
+    return img
+
+def encode_png(img, compress_level, compress_type, optimize):
+    """Encode an image as PNG with the given zlib settings and return the bytes"""
+    # save() stores the encoder options on the image object, so concurrent encodes each need their own copy
+    img = img.copy()
+    png_io = io.BytesIO()
+    img.save(png_io, format='PNG', compress_level=compress_level, compress_type=compress_type, optimize=optimize)
+    return png_io.getvalue()
+
+def optimize_png(img, compress_level, time_budget, max_workers=1):
+    """Try several PNG encodings on max_workers threads and return the smallest one.
+
+    The time budget covers the lossless mode reduction too. No new candidate is started
+    once it has passed; encodes already running are finished before returning, so no
+    work outlives the call.
+    """
+    deadline = time.monotonic() + time_budget
+    reduced = reduce_png_mode(img)
+    paletted = None
+    if reduced.mode in ('RGB', 'RGBA'):
+        paletted = to_exact_palette(reduced, deadline)
+
+    # The regular encoder settings go first so there is always a result no larger than a plain save
+    candidates = [(candidate, compress_level, -1, True) for candidate in filter(None, [reduced, paletted])]
+    # Palette images are written without row filters, so the filtered truecolour/greyscale version can still win
+    for candidate in filter(None, [paletted, reduced]):
+        for strategy in PNG_ZLIB_STRATEGIES:
+            candidates.append((candidate, 9, strategy, False))
+
+    finished = []
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        running = set()
+        for index, candidate in enumerate(candidates):
+            # Wait for a free thread, and stop starting candidates once the budget is spent
+            if len(running) >= max_workers:
+                done, running = wait(running, return_when=FIRST_COMPLETED)
+                finished.extend(done)
+            if index and time.monotonic() >= deadline:
+                break
+            running.add(executor.submit(encode_png, *candidate))
+        finished.extend(wait(running)[0])
+
+    results = [f.result() for f in finished if f.exception() is None]
+    if not results:
+        raise finished[0].exception()
+    return min(results, key=len)
+
+# Formats that can hold every frame of an animated source in one file
+ANIMATED_FORMATS = ['WEBP', 'AVIF']
+
+# Image files that can be converted, and archives whose images can be read without extracting
+IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.webp', '.avif', '.bmp', '.ico', '.heic', '.heif')
+ARCHIVE_EXTENSIONS = ('.zip', '.tar', '.tgz', '.tar.gz')
+# Separates the archive path from the member name in a source path ("photos.zip::2024/img.heic")
+ARCHIVE_MEMBER_SEPARATOR = '::'
+# Buffer size for writing archive output in large sequential chunks
+ARCHIVE_BUFFER_SIZE = 8 * 1024 * 1024
+# Number of input archives a conversion worker keeps open between members
+ARCHIVE_CACHE_SIZE = 8
+
+# Input archives kept open by this worker process, least recently used first
+open_archives = OrderedDict()
+
+def open_archive(archive_path):
+    """Open an input archive for reading"""
+    if archive_path.lower().endswith('.zip'):
+        return zipfile.ZipFile(archive_path)
+    return tarfile.open(archive_path, 'r:*')
+
+def get_worker_archive(archive_path):
+    """Return (archive, tar members by name) for an input archive kept open in this worker process.
+
+    The name lookup is None for ZIP files, which already index their members by name;
+    TarFile only searches its member list one by one.
+    """
+    if archive_path in open_archives:
+        open_archives.move_to_end(archive_path)
+        return open_archives[archive_path]
+    archive = open_archive(archive_path)
+    members = None if isinstance(archive, zipfile.ZipFile) else {member.name: member for member in archive.getmembers()}
+    open_archives[archive_path] = (archive, members)
+    if len(open_archives) > ARCHIVE_CACHE_SIZE:
+        open_archives.popitem(last=False)[1][0].close()
+    return archive, members
+
+def list_archive_images(archive_path):
+    """Return source paths for every image stored in an archive"""
+    with open_archive(archive_path) as archive:
+        if isinstance(archive, zipfile.ZipFile):
+            names = [info.filename for info in archive.infolist() if not info.is_dir()]
+        else:
+            names = [member.name for member in archive.getmembers() if member.isfile()]
+    return [f"{archive_path}{ARCHIVE_MEMBER_SEPARATOR}{name}" for name in names if name.lower().endswith(IMAGE_EXTENSIONS)]
+
+def open_source(img_path):
+    """Open a source image from disk or directly from inside an archive"""
+    if ARCHIVE_MEMBER_SEPARATOR not in img_path:
+        return Image.open(img_path)
+    archive_path, member = img_path.split(ARCHIVE_MEMBER_SEPARATOR, 1)
+    archive, members = get_worker_archive(archive_path)
+    if members is None:
+        data = archive.read(member)
+    else:
+        data = archive.extractfile(members[member]).read()
+    return Image.open(io.BytesIO(data))
+
+def source_stem(img_path):
+    """Return the filename stem of a source image, looking inside archive paths"""
+    return Path(img_path.split(ARCHIVE_MEMBER_SEPARATOR)[-1]).stem
+
+def source_folder(img_path):
+    """Return the folder of an archive member inside its archive ('' for files on disk), without '..' parts"""
+    if ARCHIVE_MEMBER_SEPARATOR not in img_path:
+        return ''
+    member = img_path.split(ARCHIVE_MEMBER_SEPARATOR, 1)[1]
+    return '/'.join(part for part in member.replace('\\', '/').split('/')[:-1] if part not in ('', '.', '..'))
+
+def count_frames(img, ico_sizes=False):
+    """Return the number of frames stored in an opened image.
+
+    The sizes in an ICO file only count as frames when ico_sizes is set (splitting
+    frames into separate files); otherwise an ICO is its largest size alone.
+    """
+    if img.format == 'ICO':
+        return len(img.info.get('sizes', [img.size])) if ico_sizes else 1
+    return getattr(img, 'n_frames', 1)
+
+def seek_frame(img, index):
+    """Move an opened image to the given frame, decoding only that frame"""
+    if img.format == 'ICO':
+        # ICO files store one bitmap per size instead of seekable frames - largest first
+        img.size = sorted(img.info['sizes'], reverse=True)[index]
+        img.load()
+    else:
+        img.seek(index)
+
+def iter_frames(img):
+    """Yield every frame of an opened image one at a time"""
+    if img.format == 'ICO':
+        for index in range(count_frames(img, ico_sizes=True)):
+            seek_frame(img, index)
+            yield img
+    else:
+        yield from ImageSequence.Iterator(img)
+
+def build_output_name(img_path, settings, frame_index=None):
+    """Build the output filename for a source image (and optional frame number)"""
+    base_name = source_stem(img_path)
+    if frame_index is not None:
+        base_name += f"_frame{frame_index + 1:03d}"
+    if settings['rescale_percent'] != 100:
+        base_name += f"_{settings['rescale_percent']}pct"
+    if settings['timestamp']:
+        base_name += f"_{settings['timestamp']}"
+    name = f"{base_name}.{settings['ext']}"
+    # Inside an output archive, keep the folder an archive member came from so same-named members stay apart
+    if settings['archive_format'] and source_folder(img_path):
+        name = f"{source_folder(img_path)}/{name}"
+    return name
+
+# Rendering intents offered for colour management, in ImageCms.Intent order
+RENDERING_INTENTS = ['Perceptual', 'Relative Colorimetric', 'Saturation', 'Absolute Colorimetric']
+# Number of built ICC transforms kept per process
+ICC_TRANSFORM_CACHE_SIZE = 32
+
+# Process-wide LRU cache of built ImageCms transforms, shared by the frame encoding threads
+icc_transform_cache = OrderedDict()
+icc_transform_lock = threading.Lock()
+
+@lru_cache(maxsize=4)
+def open_target_profile(target_profile):
+    """Open the target ICC profile file, or create sRGB when no file is chosen"""
+    if target_profile:
+        return ImageCms.getOpenProfile(target_profile)
+    return ImageCms.ImageCmsProfile(ImageCms.createProfile('sRGB'))
+
+def build_icc_transform(icc_profile, target_profile, in_mode, out_mode, intent):
+    """Build an ImageCms transform from an embedded profile to sRGB or a profile file"""
+    source = ImageCms.ImageCmsProfile(io.BytesIO(icc_profile))
+    target = open_target_profile(target_profile)
+    return ImageCms.buildTransform(source, target, in_mode, out_mode, renderingIntent=intent)
+
+def get_icc_transform(icc_profile, target_profile, in_mode, out_mode, intent):
+    """Return a cached transform keyed by (source profile hash, target profile, mode, intent)"""
+    key = (hashlib.sha1(icc_profile).digest(), target_profile, in_mode, out_mode, intent)
+    with icc_transform_lock:
+        if key in icc_transform_cache:
+            icc_transform_cache.move_to_end(key)
+            return icc_transform_cache[key]
+    try:
+        transform = build_icc_transform(icc_profile, target_profile, in_mode, out_mode, intent)
+    except (ImageCms.PyCMSError, OSError, ValueError) as e:
+        # Remember broken or mismatched profiles too so they are not rebuilt for every image
+        print(f"Warning: Could not build colour transform: {e}")
+        transform = None
+    with icc_transform_lock:
+        icc_transform_cache[key] = transform
+        if len(icc_transform_cache) > ICC_TRANSFORM_CACHE_SIZE:
+            icc_transform_cache.popitem(last=False)
+    return transform
+
+def apply_color_management(img, settings):
+    """Convert an image from its embedded ICC profile to sRGB or the chosen target profile.
+
+    Palette, greyscale and grey+alpha images keep their mode; the image is returned
+    unchanged when no transform can be built for its profile.
+    """
+    icc_profile = img.info.get('icc_profile')
+    if ImageCms is None or not icc_profile:
+        return img
+
+    if img.mode == 'P':
+        # Transform only the palette entries so the image stays paletted
+        palette = img.getpalette()
+        if not palette:
+            return img
+        palette_img = Image.frombytes('RGB', (len(palette) // 3, 1), bytes(palette))
+        palette_img.info['icc_profile'] = icc_profile
+        converted_palette = apply_color_management(palette_img, settings)
+        if converted_palette is palette_img:
+            return img
+        converted = img.copy()
+        if img.palette.mode == 'RGBA':
+            # Keep the per-entry alpha of RGBA palettes
+            alphas = img.getpalette('RGBA')[3::4]
+            rgb = converted_palette.tobytes()
+            converted.putpalette([value for i, alpha in enumerate(alphas) for value in (*rgb[i * 3:i * 3 + 3], alpha)], 'RGBA')
+        else:
+            converted.putpalette(converted_palette.tobytes())
+        return tag_color_managed(converted, img, converted_palette.info.get('icc_profile'))
+    if img.mode == 'LA':
+        # Transform the grey band and put the untouched alpha back
+        grey = img.getchannel('L')
+        grey.info['icc_profile'] = icc_profile
+        converted_grey = apply_color_management(grey, settings)
+        if converted_grey is grey:
+            return img
+        converted = Image.merge('LA', (converted_grey, img.getchannel('A')))
+        return tag_color_managed(converted, img, converted_grey.info.get('icc_profile'))
+    if img.mode not in ('RGB', 'RGBA', 'CMYK', 'L'):
+        return img
+
+    target_profile = settings['target_profile']
+    grey_target = open_target_profile(target_profile).profile.xcolor_space.strip() == 'GRAY'
+    if img.mode == 'L':
+        out_mode = 'L' if grey_target else 'RGB'
+    else:
+        out_mode = 'RGBA' if img.mode == 'RGBA' else 'RGB'
+
+    transform = get_icc_transform(icc_profile, target_profile, img.mode, out_mode, settings['rendering_intent'])
+    if transform is None:
+        return img
+    converted = ImageCms.applyTransform(img, transform)
+    if img.mode == 'L' and converted.mode == 'RGB':
+        # A grey profile maps onto neutral RGB, so the pixels can go back to greyscale
+        converted = converted.convert('L')
+
+    # sRGB output is left untagged; any other target profile is embedded when it matches the output pixels
+    target_icc = None
+    if target_profile and (converted.mode != 'L' or grey_target):
+        target_icc = open_target_profile(target_profile).tobytes()
+    return tag_color_managed(converted, img, target_icc)
+
+def tag_color_managed(converted, original, icc_profile):
+    """Copy the original image info onto a colour-managed image, replacing its ICC profile"""
+    converted.info = {key: value for key, value in original.info.items() if key != 'icc_profile'}
+    if icc_profile:
+        converted.info['icc_profile'] = icc_profile
+    return converted
+
+def flatten_alpha(img, bg_rgb):
+    """Composite a transparent image onto bg_rgb in a single pass, or drop alpha that is fully opaque"""
+    if img.mode == 'P' and 'transparency' in img.info:
+        img = img.convert('RGBA')
+    if img.mode not in ('RGBA', 'LA'):
+        return img
+
+    # Only the alpha band is copied (getextrema() on the whole image would split every band)
+    alpha = img.getchannel('A')
+    # Fully opaque alpha: just drop the channel, there is nothing to composite
+    if alpha.getextrema()[0] == 255:
+        return img.convert('RGB' if img.mode == 'RGBA' else 'L')
+
+    # paste() blends RGBA/LA pixels straight into the RGB background in one pass,
+    # without split() or an intermediate RGB conversion of the source
+    background = Image.new('RGB', img.size, bg_rgb)
+    background.paste(img, mask=alpha)
+    return background
+
+def prepare_frame(img, settings):
+    """Rescale an image and convert it to a mode the target format can store"""
+    target_format = settings['target_format']
+    rescale_percent = settings['rescale_percent']
+
+    # Rescale image if not 100%
+    if rescale_percent != 100:
+        new_width = int(img.size[0] * rescale_percent / 100)
+        new_height = int(img.size[1] * rescale_percent / 100)
+        img = img.resize((new_width, new_height), Image.Resampling.LANCZOS)
+
+    # Colour-manage after rescaling so the transform runs on fewer pixels
+    if settings['color_manage']:
+        img = apply_color_management(img, settings)
+    icc_profile = img.info.get('icc_profile')
+
+    # JPEG and BMP cannot store transparency - flatten it onto the background color
+    if target_format in ['jpg', 'jpeg', 'bmp']:
+        img = flatten_alpha(img, settings['bg_rgb'])
+    # Always convert to RGB for JPEG/JPG to avoid mode errors
+    if target_format in ['jpg', 'jpeg'] and img.mode != 'RGB':
+        img = img.convert('RGB')
+    # Keep the profile through mode conversions that leave the pixels in its colour space,
+    # and drop it once they no longer are (CMYK or grey data converted to RGB)
+    if icc_profile and icc_color_space(icc_profile) == ICC_MODE_COLOR_SPACES.get(img.mode):
+        img.info['icc_profile'] = icc_profile
+    else:
+        img.info.pop('icc_profile', None)
+    return img
+
+def new_output(name, settings):
+    """Return where an output file is written: a path in the output folder, or a buffer for archive output"""
+    if settings['archive_format']:
+        return io.BytesIO()
+    return Path(settings['output_dir']) / name
+
+def output_result(name, output):
+    """Return the (name, data) pair reported for a written output; data is None when it is already on disk"""
+    return (name, output.getvalue() if isinstance(output, io.BytesIO) else None)
+
+def write_bytes(output, data):
+    """Write encoded image data to an output path or an open binary file"""
+    if isinstance(output, (str, Path)):
+        with open(output, 'wb') as f:
+            f.write(data)
+    else:
+        output.write(data)
+
+def get_save_kwargs(settings):
+    """Return the Pillow encoder options for the target format"""
+    save_format = settings['save_format']
+    save_kwargs = {}
+    if save_format == 'JPEG':
+        save_kwargs['quality'] = settings['quality']
+        save_kwargs['optimize'] = True
+    elif save_format == 'WEBP':
+        save_kwargs['quality'] = settings['quality']
+        save_kwargs['method'] = 6
+    elif save_format == 'AVIF':
+        save_kwargs['quality'] = settings['quality']
+        save_kwargs['speed'] = 6
+    elif save_format == 'PNG':
+        save_kwargs['compress_level'] = settings['compress_level']
+        save_kwargs['optimize'] = True
+    return save_kwargs
+
+def save_ico(img, output):
+    """Write a multi-size ICO file containing all standard sizes"""
+    ico_sizes = [(16,16), (32,32), (48,48), (64,64), (128,128), (256,256)]
+    
+    # Ensure image is in RGBA mode for ICO
+    if img.mode != 'RGBA':
+        img = img.convert('RGBA')
+    
+    # Create images for each size
+    ico_images = []
+    for size in ico_sizes:
+        # Resize image maintaining aspect ratio
+        resized = img.copy()
+        resized.thumbnail(size, Image.Resampling.LANCZOS)
+        
+        # Create new image with exact size and center the resized image
+        centered = Image.new('RGBA', size, (0, 0, 0, 0))
+        paste_x = (size[0] - resized.size[0]) // 2
+        paste_y = (size[1] - resized.size[1]) // 2
+        centered.paste(resized, (paste_x, paste_y))
+        ico_images.append(centered)
+    
+    # Create direct binary ICO file according to specs
+    try:
+        print(f"Creating ICO using direct binary format implementation")
+        import struct
+        
+        # Convert all images to PNG binary data
+        image_data = []
+        for ico_img in ico_images:
+            # Save image as PNG
+            png_io = io.BytesIO()
+            ico_img.save(png_io, format='PNG')
+            png_data = png_io.getvalue()
+            width, height = ico_img.size
+            
+            # Colors in palette (0 for true color)
+            colors = 0
+            # Color planes (should be 1)
+            planes = 1
+            # Bits per pixel (32 for RGBA)
+            bpp = 32
+            # Size of PNG data
+            size = len(png_data)
+            
+            image_data.append((width, height, colors, planes, bpp, png_data, size))
+        
+        # Create the ICO file in memory, then write it out in one go
+        with io.BytesIO() as f:
+            # ICO header (6 bytes)
+            # 0-1: Reserved (0)
+            # 2-3: Image type (1 for ICO)
+            # 4-5: Number of images
+            f.write(struct.pack('<HHH', 0, 1, len(image_data)))
+            
+            # Calculate offset to start of bitmap data
+            # Header (6 bytes) + (directory entries (16 bytes each))
+            offset = 6 + len(image_data) * 16;
+            
+            # Write directory entries
+            for width, height, colors, planes, bpp, data, size in image_data:
+                # Write directory entry (16 bytes)
+                # 0: Width (0-255, 0 means 256)
+                # 1: Height (0-255, 0 means 256)
+                # 2: Colors in palette (0 for true color)
+                # 3: Reserved (0)
+                # 4-5: Color planes (should be 1)
+                # 6-7: Bits per pixel
+                # 8-11: Size of image data
+                # 12-15: Offset to image data
+                width_byte = 0 if width == 256 else width
+                height_byte = 0 if height == 256 else height
+                f.write(struct.pack('<BBBBHHII', width_byte, height_byte, colors, 0, planes, bpp, size, offset))
+                offset += size
+            
+            # Write image data
+            for _, _, _, _, _, data, _ in image_data:
+                f.write(data)
+            ico_data = f.getvalue()
+        write_bytes(output, ico_data)
+        
+        print(f"Successfully created multi-size ICO file using direct binary format")
+        
+        # Check if the file was created successfully
+        try:
+            with Image.open(io.BytesIO(ico_data)) as verify_img:
+                print(f"Verified ICO has {getattr(verify_img, 'n_frames', 1)} frames")
+        except Exception as verify_error:
+            print(f"Warning: Could not verify ICO file: {verify_error}")
+        
+    except Exception as e:
+        import traceback
+        print(f"Error creating multi-size ICO with direct binary method: {e}")
+        traceback.print_exc()
+        
+        # Last resort - just use PIL to create a single-size ICO
+        print("Falling back to single-size ICO")
+        ico_images[0].save(output, format='ICO')  # Save smallest size for favicon
+
+def save_image(img, output, settings):
+    """Save a prepared image to an output path or binary file in the target format"""
+    save_format = settings['save_format']
+    if save_format == 'ICO':
+        save_ico(img, output)
+    elif save_format == 'PNG' and settings['png_optimize']:
+        write_bytes(output, optimize_png(img, settings['compress_level'], settings['png_time_budget'],
+                                         max_workers=settings['threads']))
+    else:
+        save_kwargs = get_save_kwargs(settings)
+        if img.info.get('icc_profile'):
+            save_kwargs['icc_profile'] = img.info['icc_profile']
+        img.save(output, format=save_format, **save_kwargs)
+
+class FrameStream(Image.Image):
+    """Multi-frame image that decodes, rescales and converts one source frame per seek.
+
+    Passed to the animated WEBP/AVIF encoders with save_all=True so that only the
+    current frame is held in memory instead of the whole decoded animation.
+    """
+
+    def __init__(self, source, settings):
+        super().__init__()
+        self.source = source
+        self.settings = settings
+        self.n_frames = count_frames(source)
+        self.is_animated = self.n_frames > 1
+        # Filled in as frames are decoded; the encoders read duration[i] after seeking to frame i
+        self.durations = [0] * self.n_frames
+        self.output_size = None
+        self.icc_profile = None
+        self.frame_index = -1
+        self.seek(0)
+
+    def seek(self, frame):
+        if frame == self.frame_index:
+            return
+        if not 0 <= frame < self.n_frames:
+            raise EOFError("no more frames")
+        seek_frame(self.source, frame)
+        self.source.load()
+        img = prepare_frame(self.source, self.settings)
+        if img.mode not in ('RGB', 'RGBA'):
+            img = img.convert('RGBA')
+        # Every frame of an animation must share the first frame's size
+        if self.output_size is None:
+            self.output_size = img.size
+        elif img.size != self.output_size:
+            img = img.resize(self.output_size, Image.Resampling.LANCZOS)
+        self.durations[frame] = self.source.info.get('duration', 100)
+        self.icc_profile = img.info.get('icc_profile')
+        self.im = img.im
+        self._mode = img.mode
+        self._size = img.size
+        self.frame_index = frame
+
+    def tell(self):
+        return self.frame_index
+
+def save_frame(frame, name, settings):
+    """Prepare and save a single frame that was split out of a multi-frame image"""
+    output = new_output(name, settings)
+    save_image(prepare_frame(frame, settings), output, settings)
+    return output_result(name, output)
+
+def convert_frames_separately(img, img_path, settings):
+    """Save every frame of an opened image as its own file, encoding frames in parallel"""
+    max_workers = settings['threads']
+    outputs = []
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        pending = set()
+        for index, frame in enumerate(iter_frames(img)):
+            name = build_output_name(img_path, settings, frame_index=index)
+            # Copy the decoded frame so the source can move on to the next one
+            pending.add(executor.submit(save_frame, frame.copy(), name, settings))
+            # Keep only a few decoded frames in flight to bound memory use
+            if len(pending) >= max_workers * 2:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                outputs.extend(future.result() for future in done)
+        outputs.extend(future.result() for future in pending)
+    return outputs
+
+def convert_file(img_path, settings):
+    """Convert one source file according to settings and return (name, data) for every output written.
+
+    data is the encoded file when writing to an archive, or None when the file was written to the output folder.
+    """
+    with open_source(img_path) as img:
+        if settings['split_frames'] and count_frames(img, ico_sizes=True) > 1:
+            return convert_frames_separately(img, img_path, settings)
+        frame_count = count_frames(img)
+
+        name = build_output_name(img_path, settings)
+        output = new_output(name, settings)
+        if frame_count > 1 and settings['keep_frames'] and settings['save_format'] in ANIMATED_FORMATS:
+            stream = FrameStream(img, settings)
+            save_kwargs = get_save_kwargs(settings)
+            if stream.icc_profile:
+                save_kwargs['icc_profile'] = stream.icc_profile
+            stream.save(output, format=settings['save_format'], save_all=True,
+                        duration=stream.durations, loop=img.info.get('loop', 0), **save_kwargs)
+        else:
+            save_image(prepare_frame(img, settings), output, settings)
+        return [output_result(name, output)]
+
+class SequentialWriter:
+    """Write-only view of a file that cannot seek.
+
+    zipfile then streams each entry with a data descriptor after its data instead of
+    seeking back to rewrite the local header, which would flush the write buffer.
+    """
+
+    def __init__(self, file):
+        self.file = file
+        self.position = 0
+
+    def write(self, data):
+        self.position += len(data)
+        return self.file.write(data)
+
+    def tell(self):
+        return self.position
+
+    def seekable(self):
+        return False
+
+    def flush(self):
+        self.file.flush()
+
+class ArchiveWriter:
+    """Streams converted images into a single ZIP (stored, no recompression) or tar file.
+
+    Everything goes through one large write buffer, and a manifest.csv listing each
+    entry with its size and source is added when the archive is closed.
+    """
+
+    def __init__(self, archive_path, archive_format):
+        self.archive_path = archive_path
+        self.file = open(archive_path, 'wb', buffering=ARCHIVE_BUFFER_SIZE)
+        if archive_format == 'zip':
+            self.archive = zipfile.ZipFile(SequentialWriter(self.file), 'w', compression=zipfile.ZIP_STORED)
+        else:
+            self.archive = tarfile.open(fileobj=self.file, mode='w')
+        self.manifest = []
+        self.names = set()
+
+    def add(self, img_path, name, data):
+        """Append one converted image to the archive"""
+        # Different sources can still give the same name (the same member path in two archives)
+        stem, ext = os.path.splitext(name)
+        copy = 1
+        while name in self.names:
+            copy += 1
+            name = f"{stem}_{copy}{ext}"
+        self.names.add(name)
+        if isinstance(self.archive, zipfile.ZipFile):
+            info = zipfile.ZipInfo(name, date_time=datetime.now().timetuple()[:6])
+            self.archive.writestr(info, data)
+        else:
+            info = tarfile.TarInfo(name)
+            info.size = len(data)
+            info.mtime = int(time.time())
+            self.archive.addfile(info, io.BytesIO(data))
+        self.manifest.append((name, len(data), img_path))
+
+    def close(self):
+        manifest_io = io.StringIO()
+        writer = csv.writer(manifest_io)
+        writer.writerow(['name', 'bytes', 'source'])
+        writer.writerows(self.manifest)
+        self.add(None, 'manifest.csv', manifest_io.getvalue().encode('utf-8'))
+        self.archive.close()
+        self.file.close()
+
+def conversion_worker(conn, settings):
+    """Worker process loop: convert each path received on conn and send back the result"""
+    # Tell the pool the (slow) imports are done so the timeout only covers conversion
+    conn.send(('ready', None))
+    while True:
+        img_path = conn.recv()
+        if img_path is None:
+            break
+        try:
+            conn.send(('ok', convert_file(img_path, settings)))
+        except Exception as e:
+            conn.send(('error', str(e)))
+
+class ConversionPool:
+    """Runs convert_file in isolated worker processes so a hung or crashing decoder
+    only costs its own file. Workers that exceed the per-file timeout or die are
+    killed and replaced, and the file is reported as failed with the reason.
+    """
+
+    def __init__(self, settings, timeout, worker_count=None):
+        self.settings = settings
+        self.timeout = timeout
+        self.worker_count = worker_count or os.cpu_count() or 1
+        # Spawn fresh interpreters instead of forking the running Qt application
+        self.context = multiprocessing.get_context('spawn')
+
+    def start_worker(self):
+        parent_conn, child_conn = self.context.Pipe()
+        process = self.context.Process(target=conversion_worker, args=(child_conn, self.settings), daemon=True)
+        process.start()
+        child_conn.close()
+        return {'process': process, 'conn': parent_conn, 'ready': False, 'path': None, 'started': None}
+
+    def stop_worker(self, worker, kill=False):
+        if kill:
+            worker['process'].kill()
+        else:
+            try:
+                worker['conn'].send(None)
+            except OSError:
+                pass
+            worker['process'].join(1)
+            if worker['process'].is_alive():
+                worker['process'].kill()
+        worker['process'].join()
+        worker['conn'].close()
+
+    def run(self, paths, on_progress=None, on_output=None):
+        """Convert all paths and return (files written, [(path, reason), ...] for failed files).
+
+        on_output(path, name, data) is called in this process for every output produced.
+        """
+        pending = deque(paths)
+        converted = 0
+        failures = []
+        finished = 0
+        worker_count = min(self.worker_count, len(pending))
+        # Split the CPUs between the processes so the encoder threads inside each one don't oversubscribe
+        self.settings = dict(self.settings, threads=max(1, (os.cpu_count() or 1) // max(1, worker_count)))
+        workers = [self.start_worker() for _ in range(worker_count)]
+        try:
+            while pending or any(w['path'] is not None for w in workers):
+                # Hand the next file to every idle worker
+                for worker in workers:
+                    if worker['ready'] and worker['path'] is None and pending:
+                        worker['path'] = pending.popleft()
+                        worker['started'] = time.monotonic()
+                        worker['conn'].send(worker['path'])
+
+                wait_connections([w['conn'] for w in workers] + [w['process'].sentinel for w in workers], timeout=0.1)
+
+                for i, worker in enumerate(workers):
+                    img_path = worker['path']
+                    reason = None
+                    if worker['conn'].poll():
+                        try:
+                            status, value = worker['conn'].recv()
+                        except EOFError:
+                            status, value = 'crashed', None
+                        if status == 'ready':
+                            worker['ready'] = True
+                            continue
+                        elif status == 'ok':
+                            converted += len(value)
+                            if on_output:
+                                for name, data in value:
+                                    on_output(img_path, name, data)
+                        elif status == 'error':
+                            reason = value
+                    elif not worker['process'].is_alive():
+                        status = 'crashed'
+                    elif img_path is not None and self.timeout and time.monotonic() - worker['started'] > self.timeout:
+                        status = 'timeout'
+                        reason = f"timed out after {self.timeout} s"
+                    else:
+                        continue
+
+                    if img_path is None:
+                        # Died before taking any work - retrying would just fail again
+                        raise RuntimeError(f"Conversion worker failed to start (exit code {worker['process'].exitcode})")
+                    if status == 'crashed':
+                        reason = f"worker crashed (exit code {worker['process'].exitcode})"
+                    if status in ('crashed', 'timeout'):
+                        # Replace the dead or stuck worker before handing out more files
+                        self.stop_worker(worker, kill=True)
+                        workers[i] = self.start_worker()
+                    else:
+                        worker['path'] = None
+                    if reason:
+                        print(f"Error converting {img_path}: {reason}")
+                        failures.append((img_path, reason))
+                    finished += 1
+
+                if on_progress:
+                    on_progress(finished)
+        finally:
+            for worker in workers:
+                self.stop_worker(worker)
+        return converted, failures
+
 class ImageConverter(QWidget):
     def __init__(self):
         super().__init__()
@@ -209,6 +1082,23 @@ class ImageConverter(QWidget):
         # Add size policy to allow growing
         self.output_path_label.setSizePolicy(QSizePolicy.Expanding, QSizePolicy.Preferred)
         output_layout.addWidget(self.output_path_label)
+
+        # Output mode: individual files or a single archive
+        output_mode_layout = QHBoxLayout()
+        output_mode_icon = QLabel()
+        output_mode_icon.setPixmap(qta.icon('fa5s.file-archive', color='#e12a61').pixmap(16, 16))
+        output_mode_layout.addWidget(output_mode_icon)
+        output_mode_layout.addWidget(QLabel("Save As:"))
+        output_mode_layout.addStretch()
+
+        self.output_mode_combo = QComboBox()
+        self.output_mode_combo.addItem("Separate Files", None)
+        self.output_mode_combo.addItem("ZIP Archive", 'zip')
+        self.output_mode_combo.addItem("TAR Archive", 'tar')
+        self.output_mode_combo.setToolTip("Write all converted images into one archive in the output directory instead of separate files")
+        output_mode_layout.addWidget(self.output_mode_combo)
+
+        output_layout.addLayout(output_mode_layout)
         
         # Format selection with icon
         format_layout = QHBoxLayout()
@@ -232,7 +1122,33 @@ class ImageConverter(QWidget):
         self.timestamp_checkbox.setChecked(True)
         self.timestamp_checkbox.setToolTip("Include a timestamp in output filenames to avoid overwriting existing files")
         output_layout.addWidget(self.timestamp_checkbox)
-        
+
+        # Multi-frame options (animated WebP, multi-image HEIC, multi-size ICO)
+        self.keep_frames_checkbox = QCheckBox("Keep all frames (animated WEBP/AVIF)")
+        self.keep_frames_checkbox.setChecked(True)
+        self.keep_frames_checkbox.setToolTip("Convert every frame of animated or multi-image sources instead of only the first one")
+        output_layout.addWidget(self.keep_frames_checkbox)
+
+        self.split_frames_checkbox = QCheckBox("Save each frame as a separate file")
+        self.split_frames_checkbox.setChecked(False)
+        self.split_frames_checkbox.setToolTip("Write every frame of multi-frame sources to its own file, processed in parallel")
+        output_layout.addWidget(self.split_frames_checkbox)
+
+        # Per-file timeout for the isolated conversion workers
+        timeout_layout = QHBoxLayout()
+        timeout_icon = QLabel()
+        timeout_icon.setPixmap(qta.icon('fa5s.stopwatch', color='#e12a61').pixmap(16, 16))
+        timeout_layout.addWidget(timeout_icon)
+        timeout_layout.addWidget(QLabel("Timeout per file:"))
+        timeout_layout.addStretch()
+        self.timeout_spinbox = QSpinBox()
+        self.timeout_spinbox.setRange(5, 3600)
+        self.timeout_spinbox.setValue(120)
+        self.timeout_spinbox.setSuffix(" s")
+        self.timeout_spinbox.setToolTip("Files that take longer than this (or crash the decoder) are skipped and listed in the report")
+        timeout_layout.addWidget(self.timeout_spinbox)
+        output_layout.addLayout(timeout_layout)
+
         # Quality slider (for JPEG, WEBP)
         self.quality_widget = QWidget()
         quality_layout = QVBoxLayout(self.quality_widget)
@@ -283,7 +1199,25 @@ class ImageConverter(QWidget):
         self.compression_slider.setValue(6)
         self.compression_slider.valueChanged.connect(lambda v: self.compression_value_label.setText(str(v)))
         compression_layout.addWidget(self.compression_slider)
-        
+
+        # PNG optimizer option
+        self.png_optimize_checkbox = QCheckBox("Optimize PNG (smallest file)")
+        self.png_optimize_checkbox.setChecked(False)
+        self.png_optimize_checkbox.setToolTip("Try several compression strategies in parallel and keep the smallest result.\nImages with few colours, no colour or no transparency are reduced losslessly.")
+        compression_layout.addWidget(self.png_optimize_checkbox)
+
+        png_budget_layout = QHBoxLayout()
+        png_budget_layout.addWidget(QLabel("Time budget per image:"))
+        png_budget_layout.addStretch()
+        self.png_budget_spinbox = QSpinBox()
+        self.png_budget_spinbox.setRange(1, 120)
+        self.png_budget_spinbox.setValue(5)
+        self.png_budget_spinbox.setSuffix(" s")
+        self.png_budget_spinbox.setEnabled(False)
+        png_budget_layout.addWidget(self.png_budget_spinbox)
+        compression_layout.addLayout(png_budget_layout)
+        self.png_optimize_checkbox.toggled.connect(self.png_budget_spinbox.setEnabled)
+
         output_layout.addWidget(self.compression_widget)
         
         # ICO settings
@@ -339,6 +1273,43 @@ class ImageConverter(QWidget):
         rescale_group.setLayout(rescale_layout)
         main_layout.addWidget(rescale_group)
         
+        # Color Management Section
+        color_group = QGroupBox("Color Management")
+        color_group.setStyleSheet("QGroupBox { color: #e12a61; }")
+        color_layout = QVBoxLayout()
+        
+        self.color_manage_checkbox = QCheckBox("Convert colors using embedded ICC profiles")
+        self.color_manage_checkbox.setChecked(True)
+        self.color_manage_checkbox.setToolTip("Convert wide-gamut and CMYK images to the target profile instead of copying pixel values as-is")
+        color_layout.addWidget(self.color_manage_checkbox)
+        
+        profile_layout = QHBoxLayout()
+        profile_icon = QLabel()
+        profile_icon.setPixmap(qta.icon('fa5s.palette', color='#e12a61').pixmap(16, 16))
+        profile_layout.addWidget(profile_icon)
+        profile_layout.addWidget(QLabel("Target Profile:"))
+        profile_layout.addStretch()
+        
+        self.target_profile = None
+        self.profile_btn = QPushButton("sRGB")
+        self.profile_btn.setToolTip("Choose an ICC profile file to convert to (cancel to use sRGB)")
+        self.profile_btn.clicked.connect(self.browse_target_profile)
+        profile_layout.addWidget(self.profile_btn)
+        color_layout.addLayout(profile_layout)
+        
+        intent_layout = QHBoxLayout()
+        intent_layout.addWidget(QLabel("Rendering Intent:"))
+        intent_layout.addStretch()
+        self.intent_combo = QComboBox()
+        self.intent_combo.addItems(RENDERING_INTENTS)
+        intent_layout.addWidget(self.intent_combo)
+        color_layout.addLayout(intent_layout)
+        
+        # Hide the options when Pillow was built without LittleCMS
+        color_group.setLayout(color_layout)
+        color_group.setVisible(ImageCms is not None)
+        main_layout.addWidget(color_group)
+        
         # Action Buttons and Progress Bar
         action_layout = QVBoxLayout()
         
@@ -432,6 +1403,22 @@ class ImageConverter(QWidget):
             self.output_path_label.setText(self.truncate_path(dir_path))
             self.output_path_label.setToolTip(dir_path)
         
+    def browse_target_profile(self):
+        """Choose the ICC profile to convert colors to; cancelling resets to sRGB"""
+        profile_path, _ = QFileDialog.getOpenFileName(
+            self, "Select Target ICC Profile", str(Path.home()), "ICC Profiles (*.icc *.icm);;All Files (*)"
+        )
+        if profile_path and ImageCms is not None:
+            # Check the file once here instead of failing every image in the batch
+            try:
+                ImageCms.getOpenProfile(profile_path)
+            except (ImageCms.PyCMSError, OSError) as e:
+                QMessageBox.warning(self, "Invalid ICC Profile", f"Could not read {Path(profile_path).name} as an ICC profile:\n{e}\n\nUsing sRGB instead.")
+                profile_path = ''
+        self.target_profile = profile_path or None
+        self.profile_btn.setText(Path(profile_path).stem if profile_path else "sRGB")
+        self.profile_btn.setToolTip(profile_path or "Choose an ICC profile file to convert to (cancel to use sRGB)")
+        
     def on_format_changed(self, format_name):
         # Show/hide quality, compression, and ICO controls based on format
         quality_formats = ['JPG', 'JPEG', 'WEBP', 'AVIF']
@@ -474,14 +1461,13 @@ class ImageConverter(QWidget):
     def dropEvent(self, event):
         self.dragLeaveEvent(event)
         files = [url.toLocalFile() for url in event.mimeData().urls()]
-        # Filter hanya file gambar yang didukung (termasuk .heic/.heif)
-        supported_ext = ('.png', '.jpg', '.jpeg', '.webp', '.avif', '.bmp', '.ico', '.heic', '.heif')
-        files = [f for f in files if f.lower().endswith(supported_ext)]
+        # Filter hanya file gambar yang didukung (termasuk .heic/.heif) dan arsip berisi gambar
+        files = [f for f in files if f.lower().endswith(IMAGE_EXTENSIONS + ARCHIVE_EXTENSIONS)]
         self.load_images(files)
         event.acceptProposedAction()
     
     def browse_files(self, event=None):
-        supported_extensions = "*.png *.jpg *.jpeg *.webp *.avif *.bmp *.ico *.heic *.heif"
+        supported_extensions = "*.png *.jpg *.jpeg *.webp *.avif *.bmp *.ico *.heic *.heif *.zip *.tar *.tgz *.tar.gz"
         filter_parts = [
             "PNG (*.png)",
             "JPEG (*.jpg *.jpeg)",
@@ -489,7 +1475,8 @@ class ImageConverter(QWidget):
             "AVIF (*.avif)",
             "BMP (*.bmp)",
             "ICO (*.ico)",
-            "HEIC/HEIF (*.heic *.heif)"
+            "HEIC/HEIF (*.heic *.heif)",
+            "Image Archives (*.zip *.tar *.tgz *.tar.gz)"
         ]
         file_filter = f"Supported Images ({supported_extensions});;" + ";;".join(filter_parts) + ";;All Files (*)"
         files, _ = QFileDialog.getOpenFileNames(
@@ -501,6 +1488,13 @@ class ImageConverter(QWidget):
     def load_images(self, files):
         valid_files = []
         for file in files:
+            # Images inside archives are read in place; they are checked when converted
+            if file.lower().endswith(ARCHIVE_EXTENSIONS):
+                try:
+                    valid_files.extend(list_archive_images(file))
+                except Exception as e:
+                    print(f"Error reading archive {file}: {e}")
+                continue
             try:
                 with Image.open(file) as img:
                     valid_files.append(file)
@@ -563,7 +1557,6 @@ class ImageConverter(QWidget):
         else:
             save_format = target_format.upper()
             ext = target_format.lower()
-        rescale_percent = self.rescale_slider.value()
         converted = 0
         total_files = len(self.image_paths)
         
@@ -586,178 +1579,70 @@ class ImageConverter(QWidget):
         else:
             timestamp = None
         
+        # Background color for flattening alpha comes from application palette instead of hardcoded white
+        bg_color = self.palette().color(QPalette.Base)
+        
+        # Collect all conversion settings so the per-file work does not touch the UI
+        settings = {
+            'target_format': target_format,
+            'save_format': save_format,
+            'ext': ext,
+            'output_dir': self.output_dir,
+            'rescale_percent': self.rescale_slider.value(),
+            'timestamp': timestamp,
+            'quality': self.quality_slider.value(),
+            'compress_level': self.compression_slider.value(),
+            'png_optimize': self.png_optimize_checkbox.isChecked(),
+            'png_time_budget': self.png_budget_spinbox.value(),
+            'bg_rgb': (bg_color.red(), bg_color.green(), bg_color.blue()),
+            'keep_frames': self.keep_frames_checkbox.isChecked(),
+            'split_frames': self.split_frames_checkbox.isChecked(),
+            'archive_format': self.output_mode_combo.currentData(),
+            'color_manage': self.color_manage_checkbox.isChecked() and ImageCms is not None,
+            'target_profile': self.target_profile,
+            'rendering_intent': self.intent_combo.currentIndex(),
+        }
+        archive_writer = None
+        
+        def update_progress(finished):
+            self.progress_bar.setValue(finished)
+            QApplication.processEvents()  # Ensure UI updates
+        
         try:
-            for i, img_path in enumerate(self.image_paths):
-                try:
-                    # Update progress
-                    self.progress_bar.setValue(i)
-                    QApplication.processEvents()  # Ensure UI updates
-                    
-                    with Image.open(img_path) as img:
-                        # Rescale image if not 100%
-                        if rescale_percent != 100:
-                            new_width = int(img.size[0] * rescale_percent / 100)
-                            new_height = int(img.size[1] * rescale_percent / 100)
-                            img = img.resize((new_width, new_height), Image.Resampling.LANCZOS)
-                        
-                        rgb_only_formats = ['jpeg', 'bmp']
-                        # Always convert to RGB for JPEG/JPG to avoid mode errors
-                        if target_format in ['jpg', 'jpeg']:
-                            if img.mode != 'RGB':
-                                img = img.convert('RGB')
-                        elif target_format in rgb_only_formats and img.mode in ('RGBA', 'LA', 'P'):
-                            if img.mode == 'P' and 'transparency' in img.info:
-                                img = img.convert('RGBA')
-                            if img.mode in ('RGBA', 'LA'):
-                                # Get background color from application palette instead of hardcoded white
-                                bg_color = self.palette().color(QPalette.Base)
-                                bg_rgb = (bg_color.red(), bg_color.green(), bg_color.blue())
-                                background = Image.new('RGB', img.size, bg_rgb)
-                                if img.mode == 'RGBA':
-                                    background.paste(img, mask=img.split()[-1])
-                                else:
-                                    background.paste(img, mask=img.split()[-1])
-                                img = background
-                        
-                        # Generate output filename with timestamp
-                        base_name = Path(img_path).stem
-                        if rescale_percent != 100:
-                            base_name += f"_{rescale_percent}pct"
-                        if timestamp:
-                            base_name += f"_{timestamp}"
-                        output_path = Path(self.output_dir) / f"{base_name}.{ext}"
-                        save_kwargs = {}
-                        if save_format == 'JPEG':
-                            save_kwargs['quality'] = self.quality_slider.value()
-                            save_kwargs['optimize'] = True
-                        elif save_format == 'WEBP':
-                            save_kwargs['quality'] = self.quality_slider.value()
-                            save_kwargs['method'] = 6
-                        elif save_format == 'AVIF':
-                            save_kwargs['quality'] = self.quality_slider.value()
-                            save_kwargs['speed'] = 6
-                        elif save_format == 'PNG':
-                            save_kwargs['compress_level'] = self.compression_slider.value()
-                            save_kwargs['optimize'] = True
-                        elif save_format == 'ICO':
-                            # ICO with multiple standard sizes
-                            ico_sizes = [(16,16), (32,32), (48,48), (64,64), (128,128), (256,256)]
-                            
-                            # Ensure image is in RGBA mode for ICO
-                            if img.mode != 'RGBA':
-                                img = img.convert('RGBA')
-                            
-                            # Create images for each size
-                            ico_images = []
-                            for size in ico_sizes:
-                                # Resize image maintaining aspect ratio
-                                resized = img.copy()
-                                resized.thumbnail(size, Image.Resampling.LANCZOS)
-                                
-                                # Create new image with exact size and center the resized image
-                                centered = Image.new('RGBA', size, (0, 0, 0, 0))
-                                paste_x = (size[0] - resized.size[0]) // 2
-                                paste_y = (size[1] - resized.size[1]) // 2
-                                centered.paste(resized, (paste_x, paste_y))
-                                ico_images.append(centered)
-                            
-                            # Create direct binary ICO file according to specs
-                            try:
-                                print(f"Creating ICO using direct binary format implementation")
-                                import io
-                                import struct
-                                
-                                # Convert all images to PNG binary data
-                                image_data = []
-                                for ico_img in ico_images:
-                                    # Save image as PNG
-                                    png_io = io.BytesIO()
-                                    ico_img.save(png_io, format='PNG')
-                                    png_data = png_io.getvalue()
-                                    width, height = ico_img.size
-                                    
-                                    # Colors in palette (0 for true color)
-                                    colors = 0
-                                    # Color planes (should be 1)
-                                    planes = 1
-                                    # Bits per pixel (32 for RGBA)
-                                    bpp = 32
-                                    # Size of PNG data
-                                    size = len(png_data)
-                                    
-                                    image_data.append((width, height, colors, planes, bpp, png_data, size))
-                                
-                                # Create the ICO file
-                                with open(output_path, 'wb') as f:
-                                    # ICO header (6 bytes)
-                                    # 0-1: Reserved (0)
-                                    # 2-3: Image type (1 for ICO)
-                                    # 4-5: Number of images
-                                    f.write(struct.pack('<HHH', 0, 1, len(image_data)))
-                                    
-                                    # Calculate offset to start of bitmap data
-                                    # Header (6 bytes) + (directory entries (16 bytes each))
-                                    offset = 6 + len(image_data) * 16;
-                                    
-                                    # Write directory entries
-                                    for width, height, colors, planes, bpp, data, size in image_data:
-                                        # Write directory entry (16 bytes)
-                                        # 0: Width (0-255, 0 means 256)
-                                        # 1: Height (0-255, 0 means 256)
-                                        # 2: Colors in palette (0 for true color)
-                                        # 3: Reserved (0)
-                                        # 4-5: Color planes (should be 1)
-                                        # 6-7: Bits per pixel
-                                        # 8-11: Size of image data
-                                        # 12-15: Offset to image data
-                                        width_byte = 0 if width == 256 else width
-                                        height_byte = 0 if height == 256 else height
-                                        f.write(struct.pack('<BBBBHHII', width_byte, height_byte, colors, 0, planes, bpp, size, offset))
-                                        offset += size
-                                    
-                                    # Write image data
-                                    for _, _, _, _, _, data, _ in image_data:
-                                        f.write(data)
-                                
-                                print(f"Successfully created multi-size ICO file using direct binary format")
-                                
-                                # Check if the file was created successfully
-                                try:
-                                    with Image.open(output_path) as verify_img:
-                                        print(f"Verified ICO has {getattr(verify_img, 'n_frames', 1)} frames")
-                                except Exception as verify_error:
-                                    print(f"Warning: Could not verify ICO file: {verify_error}")
-                                
-                                converted += 1
-                                continue
-                                
-                            except Exception as e:
-                                import traceback
-                                print(f"Error creating multi-size ICO with direct binary method: {e}")
-                                traceback.print_exc()
-                                
-                                # Last resort - just use PIL to create a single-size ICO
-                                print("Falling back to single-size ICO")
-                                ico_images[0].save(output_path, format='ICO')  # Save smallest size for favicon
-                                converted += 1
-                                continue
-                        
-                        # For non-ICO formats
-                        img.save(output_path, format=save_format, **save_kwargs)
-                        converted += 1
-                        
-                except Exception as e:
-                    print(f"Error converting {img_path}: {e}")
-                    continue
+            # Archive output is written here in one stream while the workers only encode
+            if settings['archive_format']:
+                archive_name = f"converted_{datetime.now().strftime('%Y%m%d_%H%M%S')}.{settings['archive_format']}"
+                archive_writer = ArchiveWriter(Path(self.output_dir) / archive_name, settings['archive_format'])
+            
+            # Each file runs in an isolated worker process with a wall-clock timeout
+            pool = ConversionPool(settings, self.timeout_spinbox.value())
+            converted, failures = pool.run(self.image_paths, on_progress=update_progress,
+                                           on_output=archive_writer.add if archive_writer else None)
+            if archive_writer:
+                archive_writer.close()
             
             # Update final progress
             self.progress_bar.setValue(total_files)
-            QMessageBox.information(self, "Success", f"Converted {converted} images to {target_format.upper()}")
+            message = f"Converted {converted} images to {target_format.upper()}"
+            if archive_writer:
+                message += f"\nSaved to {archive_writer.archive_path.name}"
+            if failures:
+                # Report skipped files with the reason they failed
+                failed = len(failures)
+                message += f"\nSkipped {failed} file{'s' if failed > 1 else ''} that failed to convert"
+                report = QMessageBox(QMessageBox.Warning, "Completed with errors", message, parent=self)
+                report.setDetailedText("\n".join(f"{img_path}: {reason}" for img_path, reason in failures))
+                report.exec()
+            else:
+                QMessageBox.information(self, "Success", message)
             
         except Exception as e:
             QMessageBox.critical(self, "Error", f"Conversion failed: {str(e)}")
         
         finally:
+            # Finish the archive even if the batch was interrupted
+            if archive_writer and not archive_writer.file.closed:
+                archive_writer.close()
             # Reset progress UI without clearing the loaded files
             self.progress_bar.setVisible(False)
             self.convert_btn.setText("Start Conversion")
@@ -797,4 +1682,5 @@ def main():
     sys.exit(app.exec())
 
 if __name__ == "__main__":
+    multiprocessing.freeze_support()
     main()
\ No newline at end of file